@@ -1,26 +1,73 @@
 
-from typing import Optional, List
+from typing import Optional, List, Dict, Iterator
+import sys
+from collections import deque
+from itertools import islice
+from bisect import bisect_left, bisect_right, insort
 import graphviz
 import csv
-import statistics
+import io
+import math
+import os
+import gzip
+import hashlib
+import json
+import pickle
+
+# Columnas con la temperatura de cada año (1961 a 2022)
+COLUMNAS_TEMPERATURA = [f'F{año}' for año in range(1961, 2023)]
+
+# Filas leídas por bloque al cargar el CSV con pandas (limita la memoria usada)
+TAMAÑO_BLOQUE_CSV = 50_000
+
+# Tamaño a partir del cual se intenta usar pandas (64 MB). Por debajo el lector
+# csv es más rápido, sobre todo porque importar pandas tarda unos 300 ms
+UMBRAL_PANDAS_CSV = 64 << 20
+
+# Tamaño del buffer de lectura del CSV sin pandas (1 MB, menos llamadas al sistema)
+TAMAÑO_BUFFER_CSV = 1 << 20
+
+# Carpeta donde se guardan los árboles ya construidos a partir de cada CSV
+DIRECTORIO_CACHE = '.arbol_cache'
+# Versión del formato de la caché: se incrementa al cambiar Nodo o ArbolAVL
+VERSION_CACHE = 1
+
+# Colores de los nodos por rango de temperatura: < 0, 0-10, 10-20, 20-30 y >= 30 °C
+LIMITES_COLOR = (0, 10, 20, 30)
+COLORES_TEMPERATURA = ('lightcyan', 'lightblue', 'lightgreen', 'orange', 'salmon')
 
 class Nodo:
     """
     Clase que representa un nodo del árbol AVL
     Cada nodo contiene información de un país y su temperatura medias
     """
+    # Atributos fijos: sin __dict__ por instancia, menos memoria y acceso más rápido
+    __slots__ = ('iso3', 'pais', 'pais_minusculas', 'temperatura_media', 'altura', 'balance',
+                 'izquierdo', 'derecho', 'padre', 'posicion')
+
     def __init__(self, iso3: str, pais: str, temperatura_media: float):
         self.iso3 = iso3  # Código ISO3 del país
         self.pais = pais  # Nombre completo del país
+        self.pais_minusculas = pais.lower()  # Nombre en minúsculas para búsquedas parciales
         self.temperatura_media = temperatura_media  # Métrica para comparación
         self.altura = 1  # Altura del nodo en el árbol
+        self.balance = 0  # Factor de balance (altura izquierda - altura derecha)
         self.izquierdo: Optional['Nodo'] = None  # Hijo izquierdo
         self.derecho: Optional['Nodo'] = None  # Hijo derecho
         self.padre: Optional['Nodo'] = None  # Referencia al padre
+        self.posicion = -1  # Índice en ArbolAVL.nodos_almacenados (-1 si no está en el árbol)
 
     def __str__(self):
         return f"{self.iso3} ({self.temperatura_media:.2f}°C)"
 
+def _importar_pandas():
+    """Importa pandas solo cuando se va a usar; devuelve None si no está instalado"""
+    try:
+        import pandas
+    except ImportError:  # pandas es opcional, sin él se usa el lector csv
+        return None
+    return pandas
+
 class LectorDatos:
     """
     En esta clase se leera y procesaran los datos del archivo CSV
@@ -32,34 +79,19 @@ class LectorDatos:
         """
         Carga los datos desde el archivo CSV y calcula la media de temperatura
             ruta_archivo: Ruta al archivo CSV
+        Los archivos grandes se leen con pandas si está instalado; el resto
+        (y todos si no hay pandas) con el módulo csv
         """
-        paises_datos = []
-        
         try:
-            with open(ruta_archivo, 'r', encoding='utf-8') as archivo:
-                lector = csv.DictReader(archivo)
+            pd = None
+            if os.path.getsize(ruta_archivo) >= UMBRAL_PANDAS_CSV:
+                pd = _importar_pandas()
+            
+            if pd is not None:
+                paises_datos = LectorDatos._cargar_con_pandas(ruta_archivo, pd)
+            else:
+                paises_datos = LectorDatos._cargar_con_csv(ruta_archivo)
                 
-                for fila in lector:
-                    # Extraer información básica
-                    iso3 = fila['ISO3']
-                    pais = fila['Country']
-                    
-                    # Extraer datos de temperatura de 1961 a 2022
-                    temperaturas = []
-                    for año in range(1961, 2023):
-                        columna = f'F{año}'
-                        if columna in fila and fila[columna]:
-                            try:
-                                temp = float(fila[columna])
-                                temperaturas.append(temp)
-                            except ValueError:
-                                continue
-                    
-                    # Calcular la media si hay datos disponibles
-                    if temperaturas:
-                        temperatura_media = statistics.mean(temperaturas)
-                        paises_datos.append((iso3, pais, temperatura_media))
-                    
             print(f"✓ Se cargaron {len(paises_datos)} países desde el archivo CSV")
             return paises_datos
             
@@ -69,6 +101,84 @@ class LectorDatos:
         except Exception as e:
             print(f"✗ Error al leer el archivo: {e}")
             return []
+
+    @staticmethod
+    def _cargar_con_pandas(ruta_archivo: str, pd) -> List[tuple]:
+        """
+        Lee el CSV con pandas por bloques de TAMAÑO_BLOQUE_CSV filas y calcula
+        las medias de cada bloque en una sola operación
+        """
+        paises_datos = []
+        bloques = pd.read_csv(ruta_archivo,
+                              usecols=lambda columna: columna in ('ISO3', 'Country') or columna in COLUMNAS_TEMPERATURA,
+                              dtype={'ISO3': str, 'Country': str},
+                              keep_default_na=False,
+                              na_values={columna: [''] for columna in COLUMNAS_TEMPERATURA},
+                              engine='c',
+                              chunksize=TAMAÑO_BLOQUE_CSV)
+        
+        # Solo se conservan las tuplas (ISO3, País, media) de cada bloque
+        for bloque in bloques:
+            # Valores no numéricos se convierten en NaN y se ignoran en la media
+            columnas = [columna for columna in bloque.columns if columna in COLUMNAS_TEMPERATURA]
+            temperaturas = bloque[columnas].apply(pd.to_numeric, errors='coerce')
+            medias = temperaturas.mean(axis=1, skipna=True).to_numpy()
+            
+            # Descartar países sin ningún dato de temperatura
+            validos = ~pd.isna(medias)
+            paises_datos.extend(zip(bloque['ISO3'].to_numpy()[validos].tolist(),
+                                    bloque['Country'].to_numpy()[validos].tolist(),
+                                    medias[validos].tolist()))
+        
+        return paises_datos
+
+    @staticmethod
+    def _cargar_con_csv(ruta_archivo: str) -> List[tuple]:
+        """
+        Lee el CSV fila por fila con el módulo csv (archivos pequeños o sin pandas)
+        Usa un buffer grande y csv.reader con las posiciones de las columnas
+        resueltas una sola vez desde el encabezado, sin crear un dict por fila
+        """
+        paises_datos = []
+        
+        with open(ruta_archivo, 'rb', buffering=TAMAÑO_BUFFER_CSV) as crudo, \
+                io.TextIOWrapper(crudo, encoding='utf-8', newline='') as archivo:
+            lector = csv.reader(archivo)
+            
+            # Posiciones de las columnas según el encabezado
+            encabezado = next(lector, [])
+            indice_iso3 = encabezado.index('ISO3')
+            indice_pais = encabezado.index('Country')
+            indices_temperatura = [i for i, columna in enumerate(encabezado) if columna in COLUMNAS_TEMPERATURA]
+            ancho = len(encabezado)
+            
+            for fila in lector:
+                # Completar filas cortas con celdas vacías
+                if len(fila) < ancho:
+                    fila.extend([''] * (ancho - len(fila)))
+                
+                # Extraer información básica
+                iso3 = fila[indice_iso3]
+                pais = fila[indice_pais]
+                
+                # Extraer datos de temperatura de 1961 a 2022
+                temperaturas = []
+                for i in indices_temperatura:
+                    if fila[i]:
+                        try:
+                            valor = float(fila[i])
+                        except ValueError:
+                            continue
+                        # Celdas 'nan' se ignoran en la media, igual que con pandas
+                        if not math.isnan(valor):
+                            temperaturas.append(valor)
+                
+                # Calcular la media si hay datos disponibles
+                if temperaturas:
+                    temperatura_media = math.fsum(temperaturas) / len(temperaturas)
+                    paises_datos.append((iso3, pais, temperatura_media))
+        
+        return paises_datos
     
     @staticmethod
     def cargar_datos_ejemplo() -> List[tuple]:
@@ -97,23 +207,136 @@ class ArbolAVL:
     def __init__(self):
         self.raiz: Optional[Nodo] = None
         self.nodos_almacenados: List[Nodo] = []  # Para operaciones de búsqueda globales
+        self._por_iso3: Dict[str, List[Nodo]] = {}  # Nodos por código ISO3 (en mayúsculas), en orden de registro
+        self._temperaturas_ordenadas: List[float] = []  # Temperaturas ordenadas (mínimo, máximo y mediana)
+        self._suma_temperaturas = 0.0  # Suma acumulada para el promedio
+        self._estadisticas: Optional[dict] = None  # Estadísticas memorizadas (None = hay que recalcular)
+        self._ids_graphviz: Optional[Dict[Nodo, str]] = None  # IDs cortos de los nodos en los gráficos
+        self._graficos_generados: Dict[str, tuple] = {}  # Ruta de cada archivo -> parámetros con que se generó
+        self._base_graphviz: Optional[graphviz.Digraph] = None  # Configuración común de los gráficos
+
+    def _registrar_nodo(self, nodo: Nodo):
+        """Agrega un nodo nuevo a nodos_almacenados y a los índices"""
+        nodo.posicion = len(self.nodos_almacenados)
+        self.nodos_almacenados.append(nodo)
+        self._por_iso3.setdefault(nodo.iso3.upper(), []).append(nodo)
+        insort(self._temperaturas_ordenadas, nodo.temperatura_media)
+        self._suma_temperaturas += nodo.temperatura_media
+        self._invalidar_caches()
+
+    def _olvidar_nodo(self, nodo: Nodo):
+        """Quita un nodo de nodos_almacenados y de los índices sin recorrer la lista"""
+        posicion = nodo.posicion
+        nodo.posicion = -1
+        ultimo = self.nodos_almacenados.pop()
+        # Mover el último nodo al hueco dejado por el eliminado
+        if ultimo is not nodo:
+            self.nodos_almacenados[posicion] = ultimo
+            ultimo.posicion = posicion
+        
+        # Si el código se repite, la búsqueda pasa al siguiente nodo registrado con él
+        clave = nodo.iso3.upper()
+        mismos_codigo = self._por_iso3[clave]
+        mismos_codigo.remove(nodo)
+        if not mismos_codigo:
+            del self._por_iso3[clave]
+        
+        temperaturas = self._temperaturas_ordenadas
+        temperaturas.pop(bisect_left(temperaturas, nodo.temperatura_media))
+        self._suma_temperaturas = self._suma_temperaturas - nodo.temperatura_media if temperaturas else 0.0
+        self._invalidar_caches()
+
+    def _invalidar_caches(self):
+        """Descarta los resultados memorizados que dependen del contenido del árbol"""
+        self._estadisticas = None
+        self._ids_graphviz = None
+        self._graficos_generados.clear()
+
+    def vaciar(self):
+        """Elimina todos los nodos del árbol y reinicia los índices"""
+        self.raiz = None
+        self.nodos_almacenados = []
+        self._por_iso3 = {}
+        self._temperaturas_ordenadas = []
+        self._suma_temperaturas = 0.0
+        self._invalidar_caches()
+
+    def __getstate__(self):
+        """Al serializar el árbol no se guardan los gráficos ni los resultados memorizados"""
+        estado = self.__dict__.copy()
+        estado['_estadisticas'] = None
+        estado['_ids_graphviz'] = None
+        estado['_graficos_generados'] = {}
+        estado['_base_graphviz'] = None
+        return estado
+
+    @staticmethod
+    def _ruta_cache(ruta_csv: str) -> tuple:
+        """
+        Devuelve el archivo de caché de un CSV y la firma (versión del formato,
+        ruta, fecha de modificación, tamaño) que debe coincidir para poder reutilizarlo
+        """
+        ruta_absoluta = os.path.abspath(ruta_csv)
+        info = os.stat(ruta_absoluta)
+        nombre = hashlib.md5(ruta_absoluta.encode('utf-8')).hexdigest() + '.pkl.gz'
+        return os.path.join(DIRECTORIO_CACHE, nombre), [VERSION_CACHE, ruta_absoluta, info.st_mtime_ns, info.st_size]
 
-    def obtener_altura(self, nodo: Optional[Nodo]) -> int:
+    def guardar_en_cache(self, ruta_csv: str) -> bool:
+        """
+        Guarda el árbol construido desde un CSV para no volver a procesarlo
+        La firma va primero en una línea JSON aparte, así se valida sin deserializar el árbol
+        """
+        try:
+            ruta_cache, firma = self._ruta_cache(ruta_csv)
+            os.makedirs(DIRECTORIO_CACHE, exist_ok=True)
+            with gzip.open(ruta_cache, 'wb', compresslevel=1) as archivo:
+                archivo.write(json.dumps(firma).encode('utf-8') + b'\n')
+                pickle.dump(self, archivo, protocol=pickle.HIGHEST_PROTOCOL)
+            return True
+        except Exception as e:
+            print(f"✗ No se pudo guardar la caché del árbol: {e}")
+            return False
+
+    @staticmethod
+    def cargar_desde_cache(ruta_csv: str) -> Optional['ArbolAVL']:
+        """
+        Recupera el árbol guardado para un CSV si el archivo no cambió desde
+        entonces (misma fecha de modificación y tamaño) y la caché tiene el formato
+        actual; si no, devuelve None. El árbol solo se deserializa si la firma coincide
+        """
+        try:
+            ruta_cache, firma = ArbolAVL._ruta_cache(ruta_csv)
+            with gzip.open(ruta_cache, 'rb') as archivo:
+                if json.loads(archivo.readline()) != firma:
+                    return None
+                arbol = pickle.load(archivo)
+        except Exception:
+            # Sin CSV, sin caché o caché dañada: se vuelve a leer el CSV
+            return None
+        
+        return arbol if isinstance(arbol, ArbolAVL) else None
+
+    @staticmethod
+    def obtener_altura(nodo: Optional[Nodo]) -> int:
         """Obtiene la altura de un nodo"""
         if not nodo:
             return 0
         return nodo.altura
 
-    def obtener_factor_balance(self, nodo: Optional[Nodo]) -> int:
-        """Calcula el factor de balance de un nodo"""
+    @staticmethod
+    def obtener_factor_balance(nodo: Optional[Nodo]) -> int:
+        """Obtiene el factor de balance de un nodo (guardado en el nodo)"""
         if not nodo:
             return 0
-        return self.obtener_altura(nodo.izquierdo) - self.obtener_altura(nodo.derecho)
+        return nodo.balance
 
     def actualizar_altura(self, nodo: Nodo):
-        """Actualiza la altura de un nodo basándose en sus hijos"""
-        nodo.altura = 1 + max(self.obtener_altura(nodo.izquierdo), 
-                             self.obtener_altura(nodo.derecho))
+        """Actualiza la altura y el factor de balance de un nodo basándose en sus hijos"""
+        altura_izquierda = nodo.izquierdo.altura if nodo.izquierdo else 0
+        altura_derecha = nodo.derecho.altura if nodo.derecho else 0
+        # Comparación directa en lugar de llamar a max() en cada nivel del camino
+        nodo.altura = 1 + (altura_izquierda if altura_izquierda > altura_derecha else altura_derecha)
+        nodo.balance = altura_izquierda - altura_derecha
 
     def rotar_derecha(self, y: Nodo) -> Nodo:
         """Realiza una rotación a la derecha"""
@@ -158,261 +381,400 @@ class ArbolAVL:
         return y
 
     def insertar(self, iso3: str, pais: str, temperatura_media: float) -> bool:
-        """Función para insertar un nuevo nodo en el árbol"""
-        try:
-            self.raiz = self._insertar_recursivo(self.raiz, iso3, pais, temperatura_media)
-            return True
-        except Exception as e:
-            print(f"Error al insertar: {e}")
+        """
+        Función para insertar un nuevo nodo en el árbol
+        Devuelve False si la temperatura es NaN, porque no se puede ordenar
+        """
+        if math.isnan(temperatura_media):
+            print("Error al insertar: la temperatura no es un número")
             return False
+        
+        self._insertar_iterativo(iso3, pais, temperatura_media)
+        return True
+
+    def _insertar_iterativo(self, iso3: str, pais: str, temperatura_media: float):
+        """Versión iterativa de insertar: desciende hasta la hoja y luego rebalancea subiendo por los padres"""
+        # Inserción normal de BST ordenando por (temperatura, ISO3):
+        # temperaturas iguales se ordenan por código sin modificar el dato
+        padre = None
+        a_la_izquierda = False
+        nodo = self.raiz
+        while nodo:
+            padre = nodo
+            a_la_izquierda = temperatura_media < nodo.temperatura_media or \
+                (temperatura_media == nodo.temperatura_media and iso3 < nodo.iso3)
+            nodo = nodo.izquierdo if a_la_izquierda else nodo.derecho
+
+        nuevo_nodo = Nodo(iso3, pais, temperatura_media)
+        self._registrar_nodo(nuevo_nodo)
+
+        if not padre:
+            self.raiz = nuevo_nodo
+            return
 
-    def _insertar_recursivo(self, nodo: Optional[Nodo], iso3: str, pais: str, temperatura_media: float) -> Nodo:
-        """version recursiva de insertar"""
-        # Inserción normal de BST
-        if not nodo:
-            nuevo_nodo = Nodo(iso3, pais, temperatura_media)
-            self.nodos_almacenados.append(nuevo_nodo)
-            return nuevo_nodo
-
-        if temperatura_media < nodo.temperatura_media:
-            nodo.izquierdo = self._insertar_recursivo(nodo.izquierdo, iso3, pais, temperatura_media)
-            nodo.izquierdo.padre = nodo
-        elif temperatura_media > nodo.temperatura_media:
-            nodo.derecho = self._insertar_recursivo(nodo.derecho, iso3, pais, temperatura_media)
-            nodo.derecho.padre = nodo
+        nuevo_nodo.padre = padre
+        if a_la_izquierda:
+            padre.izquierdo = nuevo_nodo
         else:
-            # Temperaturas iguales, agregar pequeña variación para evitar duplicados
-            temperatura_media += 0.001
-            nodo.derecho = self._insertar_recursivo(nodo.derecho, iso3, pais, temperatura_media)
-            nodo.derecho.padre = nodo
+            padre.derecho = nuevo_nodo
+
+        self._rebalancear_hacia_arriba(padre)
 
+    def _rebalancear_hacia_arriba(self, nodo: Optional[Nodo]):
+        """
+        Sube por los punteros al padre desde `nodo` hasta la raíz actualizando
+        alturas y rotando donde haga falta. Se detiene cuando un nodo no cambia
+        de altura ni rota, porque sus ancestros ya no se ven afectados
+        """
+        while nodo:
+            altura_anterior = nodo.altura
+            nueva_raiz = self._rebalancear(nodo)
+
+            if nueva_raiz is nodo:
+                if nodo.altura == altura_anterior:
+                    break
+            else:
+                # Enlazar la nueva raíz del subárbol con su padre (la rotación ya actualizó .padre)
+                padre = nueva_raiz.padre
+                if not padre:
+                    self.raiz = nueva_raiz
+                elif padre.izquierdo is nodo:
+                    padre.izquierdo = nueva_raiz
+                else:
+                    padre.derecho = nueva_raiz
+
+            nodo = nueva_raiz.padre
+
+    def _rebalancear(self, nodo: Nodo) -> Nodo:
+        """Actualiza la altura del nodo y aplica la rotación necesaria, devuelve la raíz del subárbol"""
         # Actualizar altura del nodo actual
         self.actualizar_altura(nodo)
 
-        # Obtener factor de balance
-        balance = self.obtener_factor_balance(nodo)
+        # Factor de balance ya calculado por actualizar_altura
+        balance = nodo.balance
 
-        # Casos de rotación
-        # Caso Izquierda-Izquierda
-        if balance > 1 and temperatura_media < nodo.izquierdo.temperatura_media:
-            return self.rotar_derecha(nodo)
-
-        # Caso Derecha-Derecha
-        if balance < -1 and temperatura_media > nodo.derecho.temperatura_media:
-            return self.rotar_izquierda(nodo)
+        # Caso común: el nodo sigue balanceado y no hace falta rotar
+        if -1 <= balance <= 1:
+            return nodo
 
-        # Caso Izquierda-Derecha
-        if balance > 1 and temperatura_media > nodo.izquierdo.temperatura_media:
-            nodo.izquierdo = self.rotar_izquierda(nodo.izquierdo)
+        # Casos de rotación
+        if balance > 1:
+            # Caso Izquierda-Derecha: primero se rota el hijo izquierdo
+            if nodo.izquierdo.balance < 0:
+                nodo.izquierdo = self.rotar_izquierda(nodo.izquierdo)
+            # Caso Izquierda-Izquierda
             return self.rotar_derecha(nodo)
 
-        # Caso Derecha-Izquierda
-        if balance < -1 and temperatura_media < nodo.derecho.temperatura_media:
+        # Caso Derecha-Izquierda: primero se rota el hijo derecho
+        if nodo.derecho.balance > 0:
             nodo.derecho = self.rotar_derecha(nodo.derecho)
-            return self.rotar_izquierda(nodo)
-
-        return nodo
+        # Caso Derecha-Derecha
+        return self.rotar_izquierda(nodo)
 
     def cargar_datos_masivamente(self, datos: List[tuple]) -> int:
         """
         Carga múltiples países al árbol, devolver cantidad de paises cargados con exito
         usando
             datos: Lista de tuplas (ISO3, País, Temperatura)
+        Si el árbol está vacío se construye balanceado de una vez (sin rotaciones);
+        si ya tiene nodos se inserta uno por uno
 
         """
+        if not self.raiz:
+            return self.construir_desde_lista(datos)
+        
         contador = 0
         for iso3, pais, temperatura in datos:
             if self.insertar(iso3, pais, temperatura):
                 contador += 1
         return contador
 
+    def construir_desde_lista(self, datos: List[tuple]) -> int:
+        """
+        Construye un árbol perfectamente balanceado a partir de todos los datos,
+        reemplazando el contenido actual. Ordena una sola vez por temperatura y
+        toma siempre el elemento central como raíz, sin ninguna rotación
+            datos: Lista de tuplas (ISO3, País, Temperatura)
+        """
+        # Las temperaturas NaN no se pueden ordenar: se descartan como en insertar
+        nodos = [Nodo(iso3, pais, temperatura) for iso3, pais, temperatura in datos
+                 if not math.isnan(temperatura)]
+        if len(nodos) < len(datos):
+            print(f"✗ Se descartaron {len(datos) - len(nodos)} países con temperatura no numérica")
+        
+        # Índice por código en el orden de los datos, igual que al insertar uno por uno
+        self._por_iso3 = {}
+        for nodo in nodos:
+            self._por_iso3.setdefault(nodo.iso3.upper(), []).append(nodo)
+        
+        # Mismo orden que la inserción: temperatura y, en caso de empate, ISO3
+        nodos.sort(key=lambda nodo: (nodo.temperatura_media, nodo.iso3))
+        
+        # Registrar todos los nodos de una vez (ya están ordenados por temperatura)
+        self.nodos_almacenados = nodos
+        for posicion, nodo in enumerate(nodos):
+            nodo.posicion = posicion
+        self._temperaturas_ordenadas = [nodo.temperatura_media for nodo in nodos]
+        self._suma_temperaturas = math.fsum(self._temperaturas_ordenadas)
+        self._invalidar_caches()
+        
+        self.raiz = self._construir_balanceado(nodos, 0, len(nodos) - 1)
+        if self.raiz:
+            self.raiz.padre = None
+        return len(nodos)
+
+    def _construir_balanceado(self, nodos: List[Nodo], inicio: int, fin: int) -> Optional[Nodo]:
+        """Enlaza recursivamente el subárbol con los nodos ordenados nodos[inicio..fin]"""
+        if inicio > fin:
+            return None
+        
+        medio = (inicio + fin) // 2
+        nodo = nodos[medio]
+        
+        nodo.izquierdo = self._construir_balanceado(nodos, inicio, medio - 1)
+        nodo.derecho = self._construir_balanceado(nodos, medio + 1, fin)
+        if nodo.izquierdo:
+            nodo.izquierdo.padre = nodo
+        if nodo.derecho:
+            nodo.derecho.padre = nodo
+        
+        self.actualizar_altura(nodo)
+        return nodo
+
     def buscar(self, temperatura_media: float) -> Optional[Nodo]:
         """Busca un nodo dependiendo de su temperatura media"""
-        return self._buscar_recursivo(self.raiz, temperatura_media)
-
-    def _buscar_recursivo(self, nodo: Optional[Nodo], temperatura_media: float) -> Optional[Nodo]:
-        """Función recursiva para buscar un nodo"""
-        if not nodo or abs(nodo.temperatura_media - temperatura_media) < 0.1:  # Tolerancia mayor para floats
-            return nodo
+        nodo = self.raiz
+        while nodo:
+            # Una sola resta por nivel: decide la coincidencia y el lado a seguir
+            diferencia = temperatura_media - nodo.temperatura_media
+            if -0.1 < diferencia < 0.1:  # Tolerancia mayor para floats
+                return nodo
+            nodo = nodo.izquierdo if diferencia < 0 else nodo.derecho
+        return None
 
-        if temperatura_media < nodo.temperatura_media:
-            return self._buscar_recursivo(nodo.izquierdo, temperatura_media)
-        else:
-            return self._buscar_recursivo(nodo.derecho, temperatura_media)
+    def _camino_busqueda(self, temperatura_media: float) -> List[Nodo]:
+        """
+        Devuelve los nodos visitados al buscar una temperatura, desde la raíz.
+        Si la búsqueda tiene éxito el último nodo del camino es el encontrado
+        """
+        camino = []
+        nodo = self.raiz
+        while nodo:
+            camino.append(nodo)
+            diferencia = temperatura_media - nodo.temperatura_media
+            if -0.1 < diferencia < 0.1:
+                break
+            nodo = nodo.izquierdo if diferencia < 0 else nodo.derecho
+        return camino
 
     def buscar_por_codigo(self, iso3: str) -> Optional[Nodo]:
-        """Busca un nodo por su código ISO3"""
-        for nodo in self.nodos_almacenados:
-            if nodo.iso3.upper() == iso3.upper():
-                return nodo
-        return None
+        """Busca un nodo por su código ISO3 (si el código se repite, el primero registrado)"""
+        nodos = self._por_iso3.get(iso3.upper())
+        return nodos[0] if nodos else None
 
     def buscar_por_nombre(self, nombre_pais: str) -> List[Nodo]:
         """Busca nodos por nombre de país (búsqueda parcial)"""
-        resultados = []
         nombre_lower = nombre_pais.lower()
-        for nodo in self.nodos_almacenados:
-            if nombre_lower in nodo.pais.lower():
-                resultados.append(nodo)
-        return resultados
+        return [nodo for nodo in self.nodos_almacenados if nombre_lower in nodo.pais_minusculas]
 
     def eliminar(self, temperatura_media: float) -> bool:
-        """Elimina un nodo del árbol usando la métrica dada"""
-        try:
-            nodo_a_eliminar = self.buscar(temperatura_media)
-            if not nodo_a_eliminar:
-                return False
-            
-            # Remover de la lista de nodos almacenados
-            if nodo_a_eliminar in self.nodos_almacenados:
-                self.nodos_almacenados.remove(nodo_a_eliminar)
-            
-            self.raiz = self._eliminar_recursivo(self.raiz, temperatura_media)
-            return True
-        except Exception as e:
-            print(f"Error al eliminar: {e}")
+        """Elimina un nodo del árbol usando la métrica dada, devuelve False si no existe"""
+        nodo_a_eliminar = self.buscar(temperatura_media)
+        if not nodo_a_eliminar:
             return False
+        
+        # Remover de la lista de nodos almacenados y de los índices
+        self._olvidar_nodo(nodo_a_eliminar)
+        
+        self._eliminar_iterativo(nodo_a_eliminar)
+        return True
 
-    def _eliminar_recursivo(self, nodo: Optional[Nodo], temperatura_media: float) -> Optional[Nodo]:
-        """Función recursiva para eliminar un nodo"""
-        if not nodo:
-            return nodo
-
-        # Buscar el nodo a eliminar
-        if temperatura_media < nodo.temperatura_media:
-            nodo.izquierdo = self._eliminar_recursivo(nodo.izquierdo, temperatura_media)
-        elif temperatura_media > nodo.temperatura_media:
-            nodo.derecho = self._eliminar_recursivo(nodo.derecho, temperatura_media)
+    def _eliminar_iterativo(self, nodo: Nodo):
+        """
+        Desengancha el nodo del árbol y rebalancea hacia arriba por los punteros al padre
+        Los nodos se reenlazan en lugar de copiar datos, así cada Nodo conserva su país
+        """
+        if nodo.izquierdo and nodo.derecho:
+            # Nodo con dos hijos: el sucesor inorden (mínimo del subárbol derecho) ocupa su lugar
+            sucesor = nodo.derecho
+            while sucesor.izquierdo:
+                sucesor = sucesor.izquierdo
+            
+            # El rebalanceo empieza donde se desprendió el sucesor
+            # (o en el propio sucesor si era el hijo derecho del nodo)
+            inicio = sucesor if sucesor.padre is nodo else sucesor.padre
+
+            # El sucesor no tiene hijo izquierdo, se reemplaza por su hijo derecho
+            self._reemplazar_en_padre(sucesor, sucesor.derecho)
+
+            # Colocar el sucesor en la posición del nodo eliminado
+            self._reemplazar_en_padre(nodo, sucesor)
+            sucesor.izquierdo = nodo.izquierdo
+            sucesor.derecho = nodo.derecho
+            sucesor.altura = nodo.altura
+            sucesor.balance = nodo.balance
+            if sucesor.izquierdo:
+                sucesor.izquierdo.padre = sucesor
+            if sucesor.derecho:
+                sucesor.derecho.padre = sucesor
         else:
-            # Nodo encontrado, proceder con eliminación
-            if not nodo.izquierdo or not nodo.derecho:
-                temp = nodo.izquierdo if nodo.izquierdo else nodo.derecho
-                
-                if not temp:  # Nodo sin hijos
-                    temp = nodo
-                    nodo = None
-                else:  # Nodo con un hijo
-                    nodo.iso3 = temp.iso3
-                    nodo.pais = temp.pais
-                    nodo.temperatura_media = temp.temperatura_media
-                    # Actualizar referencias padre
-                    if nodo.izquierdo:
-                        nodo.izquierdo.padre = nodo
-                    if nodo.derecho:
-                        nodo.derecho.padre = nodo
-            else:
-                # Nodo con dos hijos
-                temp = self._obtener_minimo(nodo.derecho)
-                
-                # Copiar datos del sucesor inorden
-                nodo.iso3 = temp.iso3
-                nodo.pais = temp.pais
-                nodo.temperatura_media = temp.temperatura_media
-                
-                # Eliminar el sucesor inorden
-                nodo.derecho = self._eliminar_recursivo(nodo.derecho, temp.temperatura_media)
-
-        if not nodo:
-            return nodo
-
-        # Actualizar altura
-        self.actualizar_altura(nodo)
-
-        # Obtener factor de balance
-        balance = self.obtener_factor_balance(nodo)
-
-        # Rotaciones para rebalancear
-        # Caso Izquierda-Izquierda
-        if balance > 1 and self.obtener_factor_balance(nodo.izquierdo) >= 0:
-            return self.rotar_derecha(nodo)
-
-        # Caso Izquierda-Derecha
-        if balance > 1 and self.obtener_factor_balance(nodo.izquierdo) < 0:
-            nodo.izquierdo = self.rotar_izquierda(nodo.izquierdo)
-            return self.rotar_derecha(nodo)
-
-        # Caso Derecha-Derecha
-        if balance < -1 and self.obtener_factor_balance(nodo.derecho) <= 0:
-            return self.rotar_izquierda(nodo)
+            # Nodo sin hijos o con un hijo
+            inicio = nodo.padre
+            self._reemplazar_en_padre(nodo, nodo.izquierdo if nodo.izquierdo else nodo.derecho)
+
+        nodo.izquierdo = nodo.derecho = nodo.padre = None
+
+        # Rebalancear desde el punto donde cambió la estructura hasta la raíz
+        self._rebalancear_hacia_arriba(inicio)
+
+    def _reemplazar_en_padre(self, nodo: Nodo, nuevo: Optional[Nodo]):
+        """Pone `nuevo` en el lugar que ocupa `nodo` como hijo de su padre (o como raíz)"""
+        padre = nodo.padre
+        if nuevo:
+            nuevo.padre = padre
+        if not padre:
+            self.raiz = nuevo
+        elif padre.izquierdo is nodo:
+            padre.izquierdo = nuevo
+        else:
+            padre.derecho = nuevo
 
-        # Caso Derecha-Izquierda
-        if balance < -1 and self.obtener_factor_balance(nodo.derecho) > 0:
-            nodo.derecho = self.rotar_derecha(nodo.derecho)
-            return self.rotar_izquierda(nodo)
+    def recorrido_inorden(self) -> Iterator[Nodo]:
+        """Genera los nodos en inorden (de menor a mayor temperatura) usando una pila"""
+        pila = []
+        nodo = self.raiz
+        
+        while pila or nodo:
+            # Bajar por la rama izquierda guardando los nodos pendientes
+            while nodo:
+                pila.append(nodo)
+                nodo = nodo.izquierdo
+            
+            nodo = pila.pop()
+            yield nodo
+            nodo = nodo.derecho
 
-        return nodo
+    def buscar_mayor_promedio_global(self, temperatura_limite: float) -> List[Nodo]:
+        """
+        Busca nodos con temperatura mayor o igual a un valor dado, de mayor a menor
+        """
+        return list(self.rango_mayor_o_igual(temperatura_limite))
 
-    def _obtener_minimo(self, nodo: Nodo) -> Nodo:
-        """Obtiene el nodo con el valor mínimo en el subárbol"""
-        while nodo.izquierdo:
+    def rango_mayor_o_igual(self, temperatura_limite: float) -> Iterator[Nodo]:
+        """
+        Genera los nodos con temperatura mayor o igual al límite, de mayor a menor
+        Recorre el árbol en inorden inverso y se detiene al bajar del límite,
+        así solo visita O(log N + R) nodos y el resultado ya sale ordenado
+        """
+        pila = []
+        nodo = self.raiz
+        
+        while pila or nodo:
+            # Bajar por la rama derecha guardando los nodos pendientes
+            while nodo:
+                pila.append(nodo)
+                nodo = nodo.derecho
+            
+            nodo = pila.pop()
+            if nodo.temperatura_media < temperatura_limite:
+                return
+            yield nodo
             nodo = nodo.izquierdo
-        return nodo
 
-    def buscar_mayor_promedio_global(self, temperatura_limite: float) -> List[Nodo]:
-        """Busca nodos con temperatura mayor o igual a un valor dado"""
-        resultado = []
-        for nodo in self.nodos_almacenados:
-            if nodo.temperatura_media >= temperatura_limite:
-                resultado.append(nodo)
-        return sorted(resultado, key=lambda x: x.temperatura_media, reverse=True)
+    def contar_mayor_o_igual(self, temperatura_limite: float) -> int:
+        """Cuenta los nodos con temperatura mayor o igual al límite con búsqueda binaria"""
+        return len(self._temperaturas_ordenadas) - bisect_left(self._temperaturas_ordenadas, temperatura_limite)
 
     def obtener_estadisticas(self) -> dict:
-        """Obtiene estadísticas del dataset"""
+        """
+        Obtiene estadísticas del dataset
+        Mínimo, máximo y mediana salen de la lista ordenada de temperaturas y el
+        promedio de la suma acumulada, sin recorrer los nodos
+        """
         if not self.nodos_almacenados:
             return {}
         
-        temperaturas = [nodo.temperatura_media for nodo in self.nodos_almacenados]
-        return {
-            'total_paises': len(self.nodos_almacenados),
-            'temperatura_minima': min(temperaturas),
-            'temperatura_maxima': max(temperaturas),
-            'temperatura_promedio': statistics.mean(temperaturas),
-            'mediana': statistics.median(temperaturas)
-        }
+        if self._estadisticas is None:
+            temperaturas = self._temperaturas_ordenadas
+            total = len(temperaturas)
+            mitad = total // 2
+            if total % 2:
+                mediana = temperaturas[mitad]
+            else:
+                mediana = (temperaturas[mitad - 1] + temperaturas[mitad]) / 2
+            
+            self._estadisticas = {
+                'total_paises': total,
+                'temperatura_minima': temperaturas[0],
+                'temperatura_maxima': temperaturas[-1],
+                'temperatura_promedio': self._suma_temperaturas / total,
+                'mediana': mediana
+            }
+        return dict(self._estadisticas)
 
     def recorrido_por_niveles(self) -> List[List[str]]:
-        """Recorrido por niveles del árbol - Versión recursiva"""
+        """Recorrido por niveles del árbol - Recorrido en anchura (BFS) en una sola pasada"""
         if not self.raiz:
             return []
         
-        resultado = []
-        altura_maxima = self.obtener_altura(self.raiz)
+        # La altura de la raíz es exactamente el número de niveles
+        resultado = [[] for _ in range(self.raiz.altura)]
+        cola = deque([(self.raiz, 0)])
         
-        for nivel in range(1, altura_maxima + 1):
-            nodos_nivel = []
-            self._obtener_nivel_recursivo(self.raiz, nivel, 1, nodos_nivel)
-            if nodos_nivel:
-                resultado.append(nodos_nivel)
+        while cola:
+            nodo, nivel = cola.popleft()
+            resultado[nivel].append(f"{nodo.iso3}({nodo.temperatura_media:.3f}°C)")
+            
+            if nodo.izquierdo:
+                cola.append((nodo.izquierdo, nivel + 1))
+            if nodo.derecho:
+                cola.append((nodo.derecho, nivel + 1))
         
         return resultado
 
-    def _obtener_nivel_recursivo(self, nodo: Optional[Nodo], nivel_objetivo: int, nivel_actual: int, resultado: List[str]):
-        """Función recursiva para obtener nodos de un nivel específico"""
-        if not nodo:
-            return
+    def imprimir_niveles(self, salida) -> bool:
+        """
+        Escribe el recorrido por niveles en `salida` (archivo o io.StringIO), una línea
+        por nivel, directamente desde el BFS y sin listas intermedias
+        Devuelve False si el árbol está vacío
+        """
+        if not self.raiz:
+            return False
         
-        if nivel_actual == nivel_objetivo:
-            resultado.append(f"{nodo.iso3}({nodo.temperatura_media:.3f}°C)")
-        elif nivel_actual < nivel_objetivo:
-            self._obtener_nivel_recursivo(nodo.izquierdo, nivel_objetivo, nivel_actual + 1, resultado)
-            self._obtener_nivel_recursivo(nodo.derecho, nivel_objetivo, nivel_actual + 1, resultado)
+        cola = deque([(self.raiz, 0)])
+        nivel_actual = -1
+        
+        while cola:
+            nodo, nivel = cola.popleft()
+            if nivel != nivel_actual:
+                # Comienza un nuevo nivel
+                if nivel_actual >= 0:
+                    salida.write("\n")
+                salida.write(f"Nivel {nivel + 1}: ")
+                nivel_actual = nivel
+            else:
+                salida.write(" | ")
+            salida.write(f"{nodo.iso3}({nodo.temperatura_media:.3f}°C)")
+            
+            if nodo.izquierdo:
+                cola.append((nodo.izquierdo, nivel + 1))
+            if nodo.derecho:
+                cola.append((nodo.derecho, nivel + 1))
+        
+        salida.write("\n")
+        return True
 
     def obtener_nivel_nodo(self, nodo: Nodo) -> int:
-        """Obtiene el nivel de un nodo específico"""
-        return self._calcular_nivel(self.raiz, nodo.temperatura_media, 1)
-
-    def _calcular_nivel(self, nodo_actual: Optional[Nodo], temperatura_objetivo: float, nivel: int) -> int:
-        """Calcula el nivel de un nodo recursivamente"""
-        if not nodo_actual:
+        """Obtiene el nivel de un nodo específico subiendo por los punteros al padre"""
+        # Un nodo sin padre que no es la raíz ya no está en el árbol
+        if nodo.padre is None and nodo is not self.raiz:
             return -1
         
-        if abs(nodo_actual.temperatura_media - temperatura_objetivo) < 0.1:
-            return nivel
-        
-        if temperatura_objetivo < nodo_actual.temperatura_media:
-            return self._calcular_nivel(nodo_actual.izquierdo, temperatura_objetivo, nivel + 1)
-        else:
-            return self._calcular_nivel(nodo_actual.derecho, temperatura_objetivo, nivel + 1)
+        nivel = 1
+        while nodo.padre:
+            nodo = nodo.padre
+            nivel += 1
+        return nivel
 
     def obtener_padre(self, nodo: Nodo) -> Optional[Nodo]:
         """Obtiene el padre de un nodo"""
@@ -436,7 +798,53 @@ class ArbolAVL:
             return abuelo.izquierdo
 
     # ===== FUNCIONES DE VISUALIZACIÓN CON GRAPHVIZ =====
+
+    def _obtener_ids_graphviz(self) -> Dict[Nodo, str]:
+        """
+        IDs cortos ("n0", "n1", ...) para los nodos del gráfico, en lugar de
+        "nodo_<id(nodo)>". Se generan una vez y se reutilizan hasta que el árbol cambie
+        """
+        if self._ids_graphviz is None:
+            self._ids_graphviz = {nodo: f"n{i}" for i, nodo in enumerate(self.nodos_almacenados)}
+        return self._ids_graphviz
+    
+    def _nuevo_grafico(self, comentario: str) -> graphviz.Digraph:
+        """
+        Devuelve un Digraph con la configuración común (orientación y estilo de
+        nodos y aristas) ya aplicada, copiado de una plantilla que se arma una sola vez
+        """
+        if self._base_graphviz is None:
+            base = graphviz.Digraph()
+            base.attr(rankdir='TB')  # Top to Bottom
+            base.attr('node', 
+                     shape='circle', 
+                     style='filled',
+                     fontname='Arial',
+                     fontsize='10')
+            base.attr('edge', 
+                     fontname='Arial',
+                     fontsize='8')
+            self._base_graphviz = base
+        
+        dot = self._base_graphviz.copy()
+        dot.comment = comentario
+        return dot
     
+    def _grafico_vigente(self, ruta: str, clave: tuple) -> bool:
+        """
+        Indica si el archivo `ruta` sigue existiendo y lo último que se escribió
+        en él fue un gráfico con los mismos parámetros (`clave`), sin que el árbol
+        haya cambiado desde entonces, para no volver a renderizar
+        """
+        return self._graficos_generados.get(ruta) == clave and os.path.exists(ruta)
+
+    def _renderizar(self, dot, nombre_archivo: str, formato: str, ruta: str, clave: tuple):
+        """Renderiza el gráfico y recuerda con qué parámetros quedó escrito el archivo"""
+        # Si el renderizado falla el archivo puede quedar a medias: se olvida su contenido
+        self._graficos_generados.pop(ruta, None)
+        dot.render(nombre_archivo, format=formato, cleanup=True)
+        self._graficos_generados[ruta] = clave
+
     def crear_grafico(self, nombre_archivo: str = "arbol_avl", formato: str = "png", 
                      mostrar_detalles: bool = True, resaltar_nodo: Optional[Nodo] = None) -> bool:
         """
@@ -455,20 +863,15 @@ class ArbolAVL:
             print("El árbol está vacío, no se puede crear el gráfico")
             return False
         
+        ruta = os.path.abspath(f"{nombre_archivo}.{formato}")
+        clave = ('arbol', mostrar_detalles, resaltar_nodo)
+        if self._grafico_vigente(ruta, clave):
+            print(f"✓ El árbol no ha cambiado, gráfico vigente: {nombre_archivo}.{formato}")
+            return True
+        
         try:
-            # Crear objeto Digraph
-            dot = graphviz.Digraph(comment='Árbol AVL - Temperaturas por País')
-            
-            # Configuración del gráfico
-            dot.attr(rankdir='TB')  # Top to Bottom
-            dot.attr('node', 
-                    shape='circle', 
-                    style='filled',
-                    fontname='Arial',
-                    fontsize='10')
-            dot.attr('edge', 
-                    fontname='Arial',
-                    fontsize='8')
+            # Crear objeto Digraph con la configuración común
+            dot = self._nuevo_grafico('Árbol AVL - Temperaturas por País')
             
             # Agregar título
             estadisticas = self.obtener_estadisticas()
@@ -482,7 +885,7 @@ class ArbolAVL:
             self._agregar_nodos_graphviz(dot, self.raiz, mostrar_detalles, resaltar_nodo)
             
             # Renderizar el gráfico
-            dot.render(nombre_archivo, format=formato, cleanup=True)
+            self._renderizar(dot, nombre_archivo, formato, ruta, clave)
             print(f"✓ Gráfico creado exitosamente: {nombre_archivo}.{formato}")
             return True
             
@@ -492,56 +895,58 @@ class ArbolAVL:
             return False
 
     def _agregar_nodos_graphviz(self, dot, nodo: Optional[Nodo], mostrar_detalles: bool, resaltar_nodo: Optional[Nodo]):
-        """Función recursiva para agregar nodos al gráfico de Graphviz"""
+        """
+        Agrega los nodos y aristas al gráfico de Graphviz recorriendo en preorden
+        con una pila explícita, en el mismo orden que la versión recursiva
+        """
         if not nodo:
             return
         
-        # Crear ID único para el nodo
-        node_id = f"nodo_{id(nodo)}"
-        
-        # Determinar color del nodo
-        if resaltar_nodo and nodo == resaltar_nodo:
-            color = 'gold'
-            penwidth = '3'
-        else:
-            # Color basado en la temperatura
-            temp = nodo.temperatura_media
-            if temp < 0:
-                color = 'lightcyan'
-            elif temp < 10:
-                color = 'lightblue'
-            elif temp < 20:
-                color = 'lightgreen'
-            elif temp < 30:
-                color = 'orange'
-            else:
-                color = 'salmon'
-            penwidth = '1'
-        
-        # Crear etiqueta del nodo
-        if mostrar_detalles:
-            factor_balance = self.obtener_factor_balance(nodo)
-            etiqueta = f"{nodo.iso3}\\n{nodo.temperatura_media:.3f}°C\\n" + \
-                      f"Alt: {nodo.altura} | FB: {factor_balance}"
-        else:
-            etiqueta = f"{nodo.iso3}\\n{nodo.temperatura_media:.3f}°C"
-        
-        # Agregar nodo al gráfico
-        dot.node(node_id, 
-                label=etiqueta,
-                fillcolor=color,
-                penwidth=penwidth)
+        ids = self._obtener_ids_graphviz()
+        # Métodos enlazados localmente: se invocan una vez por nodo
+        agregar_nodo = dot.node
+        agregar_arista = dot.edge
         
-        # Agregar aristas a los hijos
-        if nodo.izquierdo:
-            child_id = f"nodo_{id(nodo.izquierdo)}"
-            dot.edge(node_id, child_id, label='I', color='blue')
-            self._agregar_nodos_graphviz(dot, nodo.izquierdo, mostrar_detalles, resaltar_nodo)
+        # Cada entrada: (nodo, arista desde el padre)
+        pila = [(nodo, None)]
+        apilar = pila.append
+        desapilar = pila.pop
         
-        if nodo.derecho:
-            child_id = f"nodo_{id(nodo.derecho)}"
-            dot.edge(node_id, child_id, label='D', color='red')
-            self._agregar_nodos_graphviz(dot, nodo.derecho, mostrar_detalles, resaltar_nodo)
+        while pila:
+            nodo, arista = desapilar()
+            node_id = ids[nodo]
+            
+            # Agregar arista desde el padre
+            if arista:
+                padre_id, etiqueta_arista, color_arista = arista
+                agregar_arista(padre_id, node_id, label=etiqueta_arista, color=color_arista)
+            
+            # Determinar color del nodo
+            if resaltar_nodo and nodo == resaltar_nodo:
+                color = 'gold'
+                penwidth = '3'
+            else:
+                # Color basado en la temperatura (búsqueda binaria en la tabla de rangos)
+                color = COLORES_TEMPERATURA[bisect_right(LIMITES_COLOR, nodo.temperatura_media)]
+                penwidth = '1'
+            
+            # Crear etiqueta del nodo
+            if mostrar_detalles:
+                etiqueta = f"{nodo.iso3}\\n{nodo.temperatura_media:.3f}°C\\nAlt: {nodo.altura} | FB: {nodo.balance}"
+            else:
+                etiqueta = f"{nodo.iso3}\\n{nodo.temperatura_media:.3f}°C"
+            
+            # Agregar nodo al gráfico
+            agregar_nodo(node_id, 
+                         label=etiqueta,
+                         fillcolor=color,
+                         penwidth=penwidth)
+            
+            # Apilar los hijos: el derecho primero para procesar antes el subárbol izquierdo
+            if nodo.derecho:
+                apilar((nodo.derecho, (node_id, 'D', 'red')))
+            if nodo.izquierdo:
+                apilar((nodo.izquierdo, (node_id, 'I', 'blue')))
 
     def crear_grafico_con_leyenda(self, nombre_archivo: str = "arbol_avl_detallado", 
                                  formato: str = "png") -> bool:
@@ -552,6 +957,12 @@ class ArbolAVL:
             print("El árbol está vacío, no se puede crear el gráfico")
             return False
         
+        ruta = os.path.abspath(f"{nombre_archivo}.{formato}")
+        clave = ('leyenda',)
+        if self._grafico_vigente(ruta, clave):
+            print(f"✓ El árbol no ha cambiado, gráfico vigente: {nombre_archivo}.{formato}")
+            return True
+        
         try:
             # Crear objeto Digraph principal
             dot = graphviz.Digraph(comment='Árbol AVL con Leyenda')
@@ -594,7 +1005,7 @@ class ArbolAVL:
                 leyenda.edge('l3', 'l4', style='invisible')
             
             # Renderizar
-            dot.render(nombre_archivo, format=formato, cleanup=True)
+            self._renderizar(dot, nombre_archivo, formato, ruta, clave)
             print(f"✓ Gráfico detallado creado: {nombre_archivo}.{formato}")
             return True
             
@@ -606,13 +1017,16 @@ class ArbolAVL:
         """
         Crea una visualización del camino de búsqueda para una temperatura específica
         """
+        ruta = os.path.abspath(f"{nombre_archivo}.png")
+        clave = ('busqueda', temperatura_objetivo)
+        if self._grafico_vigente(ruta, clave):
+            print(f"✓ El árbol no ha cambiado, visualización vigente: {nombre_archivo}.png")
+            return True
+        
         nodo_encontrado = self.buscar(temperatura_objetivo)
         
         try:
-            dot = graphviz.Digraph(comment='Visualización de Búsqueda AVL')
-            dot.attr(rankdir='TB')
-            dot.attr('node', shape='circle', style='filled', fontname='Arial', fontsize='10')
-            dot.attr('edge', fontname='Arial', fontsize='8')
+            dot = self._nuevo_grafico('Visualización de Búsqueda AVL')
             
             # Agregar título
             if nodo_encontrado:
@@ -622,14 +1036,13 @@ class ArbolAVL:
             
             dot.attr(label='\\n' + titulo, fontsize='14', fontname='Arial Bold')
             
-            # Crear conjunto de nodos en el camino de búsqueda
-            camino_busqueda = set()
-            self._marcar_camino_busqueda(self.raiz, temperatura_objetivo, camino_busqueda)
+            # Conjunto de nodos en el camino de búsqueda (solo se resalta si la búsqueda tuvo éxito)
+            camino_busqueda = set(self._camino_busqueda(temperatura_objetivo)) if nodo_encontrado else set()
             
             # Agregar nodos con colores especiales para el camino
             self._agregar_nodos_busqueda(dot, self.raiz, camino_busqueda, nodo_encontrado)
             
-            dot.render(nombre_archivo, format='png', cleanup=True)
+            self._renderizar(dot, nombre_archivo, 'png', ruta, clave)
             print(f"✓ Visualización de búsqueda creada: {nombre_archivo}.png")
             return True
             
@@ -637,36 +1050,13 @@ class ArbolAVL:
             print(f"Error al crear la visualización de búsqueda: {e}")
             return False
 
-    def _marcar_camino_busqueda(self, nodo: Optional[Nodo], temperatura_objetivo: float, camino: set):
-        """Marca los nodos que forman parte del camino de búsqueda"""
-        if not nodo:
-            return False
-        
-        # Agregar nodo actual al camino
-        camino.add(nodo)
-        
-        # Si encontramos el objetivo, retornar True
-        if abs(nodo.temperatura_media - temperatura_objetivo) < 0.1:
-            return True
-        
-        # Continuar búsqueda
-        if temperatura_objetivo < nodo.temperatura_media:
-            if self._marcar_camino_busqueda(nodo.izquierdo, temperatura_objetivo, camino):
-                return True
-        else:
-            if self._marcar_camino_busqueda(nodo.derecho, temperatura_objetivo, camino):
-                return True
-        
-        # Si llegamos aquí, este nodo no está en el camino exitoso
-        camino.discard(nodo)
-        return False
-
     def _agregar_nodos_busqueda(self, dot, nodo: Optional[Nodo], camino_busqueda: set, nodo_objetivo: Optional[Nodo]):
         """Agregar nodos con colores especiales para visualizar la búsqueda"""
         if not nodo:
             return
         
-        node_id = f"nodo_{id(nodo)}"
+        ids = self._obtener_ids_graphviz()
+        node_id = ids[nodo]
         
         # Determinar color del nodo
         if nodo == nodo_objetivo:
@@ -689,83 +1079,125 @@ class ArbolAVL:
         
         # Agregar aristas
         if nodo.izquierdo:
-            child_id = f"nodo_{id(nodo.izquierdo)}"
+            child_id = ids[nodo.izquierdo]
             edge_color = 'red' if nodo.izquierdo in camino_busqueda else 'gray'
             dot.edge(node_id, child_id, label='I', color=edge_color)
             self._agregar_nodos_busqueda(dot, nodo.izquierdo, camino_busqueda, nodo_objetivo)
         
         if nodo.derecho:
-            child_id = f"nodo_{id(nodo.derecho)}"
+            child_id = ids[nodo.derecho]
             edge_color = 'red' if nodo.derecho in camino_busqueda else 'gray'
             dot.edge(node_id, child_id, label='D', color=edge_color)
             self._agregar_nodos_busqueda(dot, nodo.derecho, camino_busqueda, nodo_objetivo)
 
     def mostrar_arbol_simple(self):
-        """Muestra una representación simple del árbol"""
+        """
+        Muestra una representación simple del árbol
+        Recorre en preorden con una pila explícita (primero el hijo derecho) y
+        escribe todas las líneas de una sola vez
+        """
         if not self.raiz:
             print("El árbol está vacío")
             return
         
-        print("\n=== ESTRUCTURA DEL ÁRBOL ===")
-        self._mostrar_arbol_recursivo(self.raiz, "", True)
-
-    def _mostrar_arbol_recursivo(self, nodo: Optional[Nodo], prefijo: str, es_ultimo: bool):
-        """Función recursiva para mostrar el árbol"""
-        if not nodo:
-            return
+        lineas = ["\n=== ESTRUCTURA DEL ÁRBOL ==="]
+        # Cada entrada: (nodo, prefijo, es_ultimo)
+        pila = [(self.raiz, "", True)]
         
-        print(f"{prefijo}{'└── ' if es_ultimo else '├── '}{nodo.iso3} ({nodo.temperatura_media:.3f}°C)")
-        
-        if nodo.izquierdo or nodo.derecho:
-            if nodo.derecho:
-                self._mostrar_arbol_recursivo(nodo.derecho, 
-                                            f"{prefijo}{'    ' if es_ultimo else '│   '}", 
-                                            not nodo.izquierdo)
+        while pila:
+            nodo, prefijo, es_ultimo = pila.pop()
+            lineas.append(f"{prefijo}{'└── ' if es_ultimo else '├── '}{nodo.iso3} ({nodo.temperatura_media:.3f}°C)")
+            
+            prefijo_hijos = f"{prefijo}{'    ' if es_ultimo else '│   '}"
+            # Apilar el izquierdo primero para que el derecho se muestre antes
             if nodo.izquierdo:
-                self._mostrar_arbol_recursivo(nodo.izquierdo, 
-                                            f"{prefijo}{'    ' if es_ultimo else '│   '}", 
-                                            True)
+                pila.append((nodo.izquierdo, prefijo_hijos, True))
+            if nodo.derecho:
+                pila.append((nodo.derecho, prefijo_hijos, not nodo.izquierdo))
+        
+        sys.stdout.write("\n".join(lineas) + "\n")
+
+def _emitir(*lineas: str):
+    """Escribe varias líneas en la salida estándar con una sola escritura"""
+    sys.stdout.write("\n".join(lineas) + "\n")
+
+def _leer(mensaje: str = "") -> str:
+    """
+    Equivalente a input(): muestra el mensaje y lee una línea de la entrada estándar
+    Se lanza EOFError si la entrada se cerró, igual que input()
+    """
+    sys.stdout.write(mensaje)
+    sys.stdout.flush()
+    linea = sys.stdin.readline()
+    if not linea:
+        raise EOFError
+    return linea.rstrip("\r\n")
+
+def _como_entero(texto: str) -> Optional[int]:
+    """Convierte el texto a entero, o devuelve None si no es un número entero válido"""
+    texto = texto.strip()
+    cifras = texto[1:] if texto[:1] in ('-', '+') else texto
+    return int(texto) if cifras.isdecimal() else None
+
+def _como_flotante(texto: str) -> Optional[float]:
+    """Convierte el texto a flotante, o devuelve None si no es un número decimal válido"""
+    texto = texto.strip()
+    cifras = texto[1:] if texto[:1] in ('-', '+') else texto
+    return float(texto) if cifras.replace('.', '', 1).isdecimal() else None
+
+def _es_si(respuesta: str) -> bool:
+    """Indica si la respuesta a una pregunta (s/n) es afirmativa, sin pasarla a minúsculas"""
+    return respuesta in ('s', 'S')
+
+# Textos de los menús, armados una sola vez al cargar el módulo
+MENU_PRINCIPAL = "\n".join(("\n" + "="*70,
+                             "    LABORATORIO AVL - ESTRUCTURA DE DATOS II",
+                             "="*70,
+                             "1.  Insertar nodo manualmente",
+                             "2.  Eliminar nodo",
+                             "3.  Buscar nodo por temperatura",
+                             "4.  Buscar nodo por código ISO3",
+                             "5.  Buscar nodo por nombre de país",
+                             "6.  Buscar países con temperatura >= valor",
+                             "7.  Mostrar recorrido por niveles",
+                             "8.  Mostrar estadísticas del dataset",
+                             "9. Operaciones con nodo seleccionado",
+                             "-" * 70,
+                             "10.  Crear gráfico simple del árbol",
+                             "11. crear gráfico detallado con leyenda",
+                             "12.  Visualizar búsqueda de un nodo",
+                             "13.  Resaltar nodo específico en gráfico",
+                             "14.  Recargar datos desde CSV",
+                             "-" * 70,
+                             "15. Salir",
+                             "="*70)) + "\n"
+
+# Submenú de un nodo; los datos del nodo se completan con format()
+MENU_NODO = "\n".join(("\n=== OPERACIONES CON NODO: {iso3} ===",
+                        "País: {pais}",
+                        "Temperatura media: {temperatura:.2f}°C",
+                        "\n1. Obtener nivel del nodo",
+                        "2. Obtener factor de balanceo",
+                        "3. Encontrar padre",
+                        "4. Encontrar abuelo",
+                        "5. Encontrar tío",
+                        "6. Crear gráfico resaltando este nodo",
+                        "7. Volver al menú principal")) + "\n"
 
 def mostrar_menu():
     """Muestra el menú principal del programa"""
-    print("\n" + "="*70)
-    print("    LABORATORIO AVL - ESTRUCTURA DE DATOS II")
-    print("="*70)
-    print("1.  Insertar nodo manualmente")
-    print("2.  Eliminar nodo")
-    print("3.  Buscar nodo por temperatura")
-    print("4.  Buscar nodo por código ISO3")
-    print("5.  Buscar nodo por nombre de país")
-    print("6.  Buscar países con temperatura >= valor")
-    print("7.  Mostrar recorrido por niveles")
-    print("8.  Mostrar estadísticas del dataset")
-    print("9. Operaciones con nodo seleccionado")
-    print("-" * 70)
-    print("10.  Crear gráfico simple del árbol")
-    print("11. crear gráfico detallado con leyenda")
-    print("12.  Visualizar búsqueda de un nodo")
-    print("13.  Resaltar nodo específico en gráfico")
-    print("14.  Recargar datos desde CSV")
-    print("-" * 70)
-    print("15. Salir")
-    print("="*70)
+    sys.stdout.write(MENU_PRINCIPAL)
 
 def operaciones_nodo(arbol: ArbolAVL, nodo: Nodo):
     """Submenú para operaciones específicas con un nodo"""
     while True:
-        print(f"\n=== OPERACIONES CON NODO: {nodo.iso3} ===")
-        print(f"País: {nodo.pais}")
-        print(f"Temperatura media: {nodo.temperatura_media:.2f}°C")
-        print("\n1. Obtener nivel del nodo")
-        print("2. Obtener factor de balanceo")
-        print("3. Encontrar padre")
-        print("4. Encontrar abuelo")
-        print("5. Encontrar tío")
-        print("6. Crear gráfico resaltando este nodo")
-        print("7. Volver al menú principal")
+        sys.stdout.write(MENU_NODO.format(iso3=nodo.iso3, pais=nodo.pais, temperatura=nodo.temperatura_media))
         
         try:
-            opcion = int(input("\nSeleccione una opción: "))
+            opcion = _como_entero(_leer("\nSeleccione una opción: "))
+            if opcion is None:
+                print("Error: Ingrese un número válido")
+                continue
             
             if opcion == 1:
                 nivel = arbol.obtener_nivel_nodo(nodo)
@@ -806,13 +1238,281 @@ def operaciones_nodo(arbol: ArbolAVL, nodo: Nodo):
             else:
                 print("Opción inválida")
                 
-            input("\nPresione Enter para continuar...")
+            _leer("\nPresione Enter para continuar...")
             
-        except ValueError:
-            print("Error: Ingrese un número válido")
         except Exception as e:
             print(f"Error: {e}")
 
+def _opcion_insertar(arbol: ArbolAVL):
+    """Opción 1: insertar un nodo manualmente"""
+    print("\n=== INSERTAR NODO MANUALMENTE ===")
+    iso3 = _leer("Código ISO3 del país: ").upper()
+    pais = _leer("Nombre del país: ")
+    temperatura = _como_flotante(_leer("Temperatura media (°C): "))
+    if temperatura is None:
+        print("Error: Por favor ingrese un número válido")
+        return
+    
+    if arbol.insertar(iso3, pais, temperatura):
+        print(f"✓ País {iso3} insertado correctamente")
+        if _es_si(_leer("\n¿Crear gráfico actualizado? (s/n): ")):
+            arbol.crear_grafico("arbol_despues_insercion")
+    else:
+        print("✗ Error al insertar el país")
+
+def _opcion_eliminar(arbol: ArbolAVL):
+    """Opción 2: eliminar un nodo por temperatura"""
+    print("\n=== ELIMINAR NODO ===")
+    temperatura = _como_flotante(_leer("Temperatura media del país a eliminar: "))
+    if temperatura is None:
+        print("Error: Por favor ingrese un número válido")
+        return
+    
+    nodo = arbol.buscar(temperatura)
+    if nodo:
+        print(f"País encontrado: {nodo.iso3} - {nodo.pais} ({nodo.temperatura_media:.2f}°C)")
+        confirmar = _leer("¿Confirma la eliminación? (s/n): ")
+        if _es_si(confirmar):
+            if arbol.eliminar(temperatura):
+                print("✓ País eliminado correctamente")
+                if _es_si(_leer("\n¿Crear gráfico actualizado? (s/n): ")):
+                    arbol.crear_grafico("arbol_despues_eliminacion")
+            else:
+                print("✗ Error al eliminar el país")
+        else:
+            print("Eliminación cancelada")
+    else:
+        print("✗ No se encontró un país con esa temperatura")
+
+def _opcion_buscar_temperatura(arbol: ArbolAVL):
+    """Opción 3: buscar un nodo por temperatura"""
+    print("\n=== BUSCAR NODO POR TEMPERATURA ===")
+    temperatura = _como_flotante(_leer("Temperatura media a buscar: "))
+    if temperatura is None:
+        print("Error: Por favor ingrese un número válido")
+        return
+    
+    nodo = arbol.buscar(temperatura)
+    if nodo:
+        _emitir(f"✓ País encontrado:",
+                f"   ISO3: {nodo.iso3}",
+                f"   País: {nodo.pais}",
+                f"   Temperatura: {nodo.temperatura_media:.2f}°C")
+        
+        _emitir("\n¿Qué desea hacer?",
+                "1. Visualizar búsqueda",
+                "2. Operaciones con este nodo",
+                "3. Continuar")
+        
+        sub_opcion = _leer("Seleccione (1/2/3): ")
+        if sub_opcion == '1':
+            arbol.visualizar_busqueda(temperatura)
+        elif sub_opcion == '2':
+            operaciones_nodo(arbol, nodo)
+    else:
+        print("✗ No se encontró un país con esa temperatura")
+        if _es_si(_leer("\n¿Visualizar búsqueda fallida? (s/n): ")):
+            arbol.visualizar_busqueda(temperatura)
+
+def _opcion_buscar_codigo(arbol: ArbolAVL):
+    """Opción 4: buscar un nodo por código ISO3"""
+    print("\n=== BUSCAR NODO POR CÓDIGO ISO3 ===")
+    iso3 = _leer("Código ISO3 a buscar: ").upper()
+    
+    nodo = arbol.buscar_por_codigo(iso3)
+    if nodo:
+        _emitir(f"✓ País encontrado:",
+                f"   ISO3: {nodo.iso3}",
+                f"   País: {nodo.pais}",
+                f"   Temperatura: {nodo.temperatura_media:.2f}°C")
+        
+        realizar_operaciones = _leer("\n¿Realizar operaciones con este nodo? (s/n): ")
+        if _es_si(realizar_operaciones):
+            operaciones_nodo(arbol, nodo)
+    else:
+        print(f"✗ No se encontró un país con código {iso3}")
+
+def _opcion_buscar_nombre(arbol: ArbolAVL):
+    """Opción 5: buscar nodos por nombre de país"""
+    print("\n=== BUSCAR NODO POR NOMBRE DE PAÍS ===")
+    nombre = _leer("Nombre del país (búsqueda parcial): ")
+    
+    nodos = arbol.buscar_por_nombre(nombre)
+    if nodos:
+        print(f"✓ Se encontraron {len(nodos)} países:")
+        for i, nodo in enumerate(nodos, 1):
+            print(f"   {i}. {nodo.iso3} - {nodo.pais} ({nodo.temperatura_media:.2f}°C)")
+        
+        if len(nodos) == 1:
+            realizar_operaciones = _leer("\n¿Realizar operaciones con este nodo? (s/n): ")
+            if _es_si(realizar_operaciones):
+                operaciones_nodo(arbol, nodos[0])
+        else:
+            seleccionar = _leer("\n¿Seleccionar un país para operaciones? (número o 'n'): ")
+            if seleccionar.isdigit():
+                indice = int(seleccionar) - 1
+                if 0 <= indice < len(nodos):
+                    operaciones_nodo(arbol, nodos[indice])
+    else:
+        print(f"✗ No se encontraron países que contengan '{nombre}'")
+
+def _opcion_buscar_mayor(arbol: ArbolAVL):
+    """Opción 6: buscar países con temperatura >= valor"""
+    print("\n=== BUSCAR PAÍSES CON TEMPERATURA >= VALOR ===")
+    temperatura_limite = _como_flotante(_leer("Temperatura mínima: "))
+    if temperatura_limite is None:
+        print("Error: Por favor ingrese un número válido")
+        return
+    
+    # Solo se recorren los primeros 10 nodos; el total sale de la lista ordenada
+    nodos = list(islice(arbol.rango_mayor_o_igual(temperatura_limite), 10))
+    if nodos:
+        total = arbol.contar_mayor_o_igual(temperatura_limite)
+        print(f"\n✓ Se encontraron {total} países:")
+        for i, nodo in enumerate(nodos, 1):  # Mostrar solo los primeros 10
+            print(f"   {i}. {nodo.iso3} - {nodo.pais} ({nodo.temperatura_media:.2f}°C)")
+        
+        if total > 10:
+            print(f"   ... y {total - 10} más")
+        
+        seleccionar = _leer("\n¿Seleccionar un país para operaciones? (número o 'n'): ")
+        if seleccionar.isdigit():
+            indice = int(seleccionar) - 1
+            if 0 <= indice < len(nodos):
+                operaciones_nodo(arbol, nodos[indice])
+    else:
+        print("✗ No se encontraron países con esa temperatura mínima")
+
+def _opcion_niveles(arbol: ArbolAVL):
+    """Opción 7: mostrar el recorrido por niveles"""
+    print("\n=== RECORRIDO POR NIVELES ===")
+    buffer = io.StringIO()
+    if arbol.imprimir_niveles(buffer):
+        sys.stdout.write(buffer.getvalue())
+    else:
+        print("El árbol está vacío")
+
+def _opcion_estadisticas(arbol: ArbolAVL):
+    """Opción 8: mostrar las estadísticas del dataset"""
+    print("\n=== ESTADÍSTICAS DEL DATASET ===")
+    stats = arbol.obtener_estadisticas()
+    if stats:
+        _emitir(f" Total de países: {stats['total_paises']}",
+                f"  Temperatura mínima: {stats['temperatura_minima']:.2f}°C",
+                f"  Temperatura máxima: {stats['temperatura_maxima']:.2f}°C",
+                f" Temperatura promedio: {stats['temperatura_promedio']:.2f}°C",
+                f" Mediana: {stats['mediana']:.2f}°C")
+    else:
+        print("No hay datos en el árbol")
+
+def _opcion_seleccionar_nodo(arbol: ArbolAVL):
+    """Opción 9: seleccionar un nodo para operaciones"""
+    print("\n=== SELECCIONAR NODO PARA OPERACIONES ===")
+    if not arbol.nodos_almacenados:
+        print("No hay nodos en el árbol")
+    else:
+        # Mostrar países ordenados por temperatura: los primeros 15 del
+        # recorrido inorden, sin ordenar toda la lista
+        paises_ordenados = list(islice(arbol.recorrido_inorden(), 15))
+        total_paises = len(arbol.nodos_almacenados)
+        print("Países disponibles (ordenados por temperatura):")
+        
+        for i, nodo in enumerate(paises_ordenados, 1):
+            print(f"   {i}. {nodo.iso3} - {nodo.pais} ({nodo.temperatura_media:.3f}°C)")
+        
+        if total_paises > 15:
+            print(f"   ... y {total_paises - 15} más")
+        
+        seleccion = _como_entero(_leer("\nSeleccione un país (número): "))
+        if seleccion is None:
+            print("Error: Ingrese un número válido")
+        elif 1 <= seleccion <= len(paises_ordenados):
+            operaciones_nodo(arbol, paises_ordenados[seleccion - 1])
+        else:
+            print("Selección inválida")
+
+def _opcion_grafico_simple(arbol: ArbolAVL):
+    """Opción 10: crear el gráfico simple del árbol"""
+    arbol.crear_grafico()
+
+def _opcion_grafico_detallado(arbol: ArbolAVL):
+    """Opción 11: crear el gráfico detallado con leyenda"""
+    arbol.crear_grafico_con_leyenda()
+
+def _opcion_visualizar_busqueda(arbol: ArbolAVL):
+    """Opción 12: visualizar la búsqueda de un nodo"""
+    print("\n=== VISUALIZAR BÚSQUEDA ===")
+    temp = _como_flotante(_leer("Temperatura a buscar: "))
+    if temp is None:
+        print("Error: Ingrese una temperatura válida")
+    else:
+        arbol.visualizar_busqueda(temp)
+
+def _opcion_resaltar_nodo(arbol: ArbolAVL):
+    """Opción 13: resaltar un nodo específico en el gráfico"""
+    print("\n=== RESALTAR NODO ===")
+    try:
+        codigo = _leer("Código ISO3 del país a resaltar: ").upper()
+        nodo = arbol.buscar_por_codigo(codigo)
+        if nodo:
+            nombre = _leer("Nombre del archivo (Enter para 'arbol_resaltado'): ") or "arbol_resaltado"
+            arbol.crear_grafico(nombre, "png", True, nodo)
+            print(f"País {nodo.pais} resaltado en el gráfico")
+        else:
+            print(f"No se encontró un país con código {codigo}")
+    except Exception as e:
+        print(f"Error: {e}")
+
+def _opcion_recargar(arbol: ArbolAVL):
+    """Opción 14: recargar los datos desde un CSV"""
+    print("\n=== RECARGAR DATOS DESDE CSV ===")
+    ruta_csv = _leer("Ingrese la ruta del archivo CSV: ").strip()
+    if ruta_csv:
+        datos_nuevos = LectorDatos.cargar_datos_desde_csv(ruta_csv)
+        if datos_nuevos:
+            confirmar = _leer(f"¿Reemplazar árbol actual con {len(datos_nuevos)} nuevos países? (s/n): ")
+            if _es_si(confirmar):
+                # Limpiar árbol actual
+                arbol.vaciar()
+                cargados = arbol.cargar_datos_masivamente(datos_nuevos)
+                arbol.guardar_en_cache(ruta_csv)
+                print(f"✓ Árbol recargado con {cargados} países")
+                
+                # Mostrar nuevas estadísticas
+                stats = arbol.obtener_estadisticas()
+                print(f"Nuevas estadísticas:")
+                print(f"   Rango: {stats['temperatura_minima']:.3f}°C - {stats['temperatura_maxima']:.3f}°C")
+                print(f"   Promedio: {stats['temperatura_promedio']:.3f}°C")
+
+def _opcion_salir(arbol: ArbolAVL):
+    """Opción 15: salir del programa"""
+    print("\n¡Gracias por usar el programa!")
+    return True
+
+def _opcion_invalida(arbol: ArbolAVL):
+    """Cualquier número fuera del menú"""
+    print("Opción inválida")
+
+# Opción del menú principal -> función que la atiende.
+# Las funciones devuelven True solo cuando hay que salir del programa
+MANEJADORES_MENU = {
+    1: _opcion_insertar,
+    2: _opcion_eliminar,
+    3: _opcion_buscar_temperatura,
+    4: _opcion_buscar_codigo,
+    5: _opcion_buscar_nombre,
+    6: _opcion_buscar_mayor,
+    7: _opcion_niveles,
+    8: _opcion_estadisticas,
+    9: _opcion_seleccionar_nodo,
+    10: _opcion_grafico_simple,
+    11: _opcion_grafico_detallado,
+    12: _opcion_visualizar_busqueda,
+    13: _opcion_resaltar_nodo,
+    14: _opcion_recargar,
+    15: _opcion_salir,
+}
+
 def main():
     """Función principal del programa"""
     arbol = ArbolAVL()
@@ -821,38 +1521,48 @@ def main():
     print("="*70)
     
     # Intentar cargar datos desde CSV
-    ruta_csv = input("Ingrese la ruta del archivo CSV (o Enter para datos de prueba): ").strip()
+    ruta_csv = _leer("Ingrese la ruta del archivo CSV (o Enter para datos de prueba): ").strip()
     if not ruta_csv:
         ruta_csv = "diccionario.txt"
     
-    datos_csv = LectorDatos.cargar_datos_desde_csv(ruta_csv)
+    # Si el CSV no cambió desde la última carga se reutiliza el árbol guardado,
+    # pero se hacen las mismas preguntas que al leer el CSV
+    arbol_guardado = ArbolAVL.cargar_desde_cache(ruta_csv)
+    if arbol_guardado:
+        total_paises = len(arbol_guardado.nodos_almacenados)
+        print(f"✓ Se recuperaron {total_paises} países de la caché ({ruta_csv} no ha cambiado)")
+    else:
+        datos_csv = LectorDatos.cargar_datos_desde_csv(ruta_csv)
+        total_paises = len(datos_csv)
     
-    if datos_csv:
-        print(f"\n¿Cargar todos los {len(datos_csv)} países del CSV? (s/n): ", end="")
-        if input().lower() == 's':
+    if total_paises:
+        if _es_si(_leer(f"\n¿Cargar todos los {total_paises} países del CSV? (s/n): ")):
             print("\nCargando datos del CSV...")
-            cargados = arbol.cargar_datos_masivamente(datos_csv)
+            if arbol_guardado:
+                arbol = arbol_guardado
+                cargados = total_paises
+            else:
+                cargados = arbol.cargar_datos_masivamente(datos_csv)
+                arbol.guardar_en_cache(ruta_csv)
             print(f"✓ Se cargaron {cargados} países exitosamente")
             
             # Mostrar estadísticas
             stats = arbol.obtener_estadisticas()
-            print(f"\nESTADÍSTICAS DEL DATASET:")
-            print(f"   Total países: {stats['total_paises']}")
-            print(f"   Temperatura mínima: {stats['temperatura_minima']:.2f}°C")
-            print(f"   Temperatura máxima: {stats['temperatura_maxima']:.2f}°C")
-            print(f"   Temperatura promedio: {stats['temperatura_promedio']:.2f}°C")
-            print(f"   Mediana: {stats['mediana']:.2f}°C")
+            _emitir(f"\nESTADÍSTICAS DEL DATASET:",
+                    f"   Total países: {stats['total_paises']}",
+                    f"   Temperatura mínima: {stats['temperatura_minima']:.2f}°C",
+                    f"   Temperatura máxima: {stats['temperatura_maxima']:.2f}°C",
+                    f"   Temperatura promedio: {stats['temperatura_promedio']:.2f}°C",
+                    f"   Mediana: {stats['mediana']:.2f}°C")
             
             # Crear gráfico inicial
-            print("\n¿Crear gráfico inicial del árbol? (s/n): ", end="")
-            if input().lower() == 's':
+            if _es_si(_leer("\n¿Crear gráfico inicial del árbol? (s/n): ")):
                 arbol.crear_grafico("arbol_inicial_csv")
         else:
             print("Datos del CSV disponibles pero no cargados")
     else:
         print("\n  No se pudieron cargar datos del CSV")
-        print("¿Cargar datos de ejemplo? (s/n): ", end="")
-        if input().lower() == 's':
+        if _es_si(_leer("¿Cargar datos de ejemplo? (s/n): ")):
             datos_ejemplo = LectorDatos.cargar_datos_ejemplo()
             cargados = arbol.cargar_datos_masivamente(datos_ejemplo)
             print(f"Se cargaron {cargados} países de ejemplo")
@@ -861,238 +1571,16 @@ def main():
         mostrar_menu()
         
         try:
-            opcion = int(input("Seleccione una opción: "))
-            
-            if opcion == 1:  # Insertar nodo manualmente
-                print("\n=== INSERTAR NODO MANUALMENTE ===")
-                iso3 = input("Código ISO3 del país: ").upper()
-                pais = input("Nombre del país: ")
-                temperatura = float(input("Temperatura media (°C): "))
-                
-                if arbol.insertar(iso3, pais, temperatura):
-                    print(f"✓ País {iso3} insertado correctamente")
-                    print("\n¿Crear gráfico actualizado? (s/n): ", end="")
-                    if input().lower() == 's':
-                        arbol.crear_grafico("arbol_despues_insercion")
-                else:
-                    print("✗ Error al insertar el país")
-                    
-            elif opcion == 2:  # Eliminar nodo
-                print("\n=== ELIMINAR NODO ===")
-                temperatura = float(input("Temperatura media del país a eliminar: "))
-                
-                nodo = arbol.buscar(temperatura)
-                if nodo:
-                    print(f"País encontrado: {nodo.iso3} - {nodo.pais} ({nodo.temperatura_media:.2f}°C)")
-                    confirmar = input("¿Confirma la eliminación? (s/n): ")
-                    if confirmar.lower() == 's':
-                        if arbol.eliminar(temperatura):
-                            print("✓ País eliminado correctamente")
-                            print("\n¿Crear gráfico actualizado? (s/n): ", end="")
-                            if input().lower() == 's':
-                                arbol.crear_grafico("arbol_despues_eliminacion")
-                        else:
-                            print("✗ Error al eliminar el país")
-                    else:
-                        print("Eliminación cancelada")
-                else:
-                    print("✗ No se encontró un país con esa temperatura")
-                    
-            elif opcion == 3:  # Buscar por temperatura
-                print("\n=== BUSCAR NODO POR TEMPERATURA ===")
-                temperatura = float(input("Temperatura media a buscar: "))
-                
-                nodo = arbol.buscar(temperatura)
-                if nodo:
-                    print(f"✓ País encontrado:")
-                    print(f"   ISO3: {nodo.iso3}")
-                    print(f"   País: {nodo.pais}")
-                    print(f"   Temperatura: {nodo.temperatura_media:.2f}°C")
-                    
-                    print("\n¿Qué desea hacer?")
-                    print("1. Visualizar búsqueda")
-                    print("2. Operaciones con este nodo")
-                    print("3. Continuar")
-                    
-                    sub_opcion = input("Seleccione (1/2/3): ")
-                    if sub_opcion == '1':
-                        arbol.visualizar_busqueda(temperatura)
-                    elif sub_opcion == '2':
-                        operaciones_nodo(arbol, nodo)
-                else:
-                    print("✗ No se encontró un país con esa temperatura")
-                    print("\n¿Visualizar búsqueda fallida? (s/n): ", end="")
-                    if input().lower() == 's':
-                        arbol.visualizar_busqueda(temperatura)
-
-            elif opcion == 4:  # Buscar por código ISO3
-                print("\n=== BUSCAR NODO POR CÓDIGO ISO3 ===")
-                iso3 = input("Código ISO3 a buscar: ").upper()
-                
-                nodo = arbol.buscar_por_codigo(iso3)
-                if nodo:
-                    print(f"✓ País encontrado:")
-                    print(f"   ISO3: {nodo.iso3}")
-                    print(f"   País: {nodo.pais}")
-                    print(f"   Temperatura: {nodo.temperatura_media:.2f}°C")
-                    
-                    realizar_operaciones = input("\n¿Realizar operaciones con este nodo? (s/n): ")
-                    if realizar_operaciones.lower() == 's':
-                        operaciones_nodo(arbol, nodo)
-                else:
-                    print(f"✗ No se encontró un país con código {iso3}")
-
-            elif opcion == 5:  # Buscar por nombre
-                print("\n=== BUSCAR NODO POR NOMBRE DE PAÍS ===")
-                nombre = input("Nombre del país (búsqueda parcial): ")
-                
-                nodos = arbol.buscar_por_nombre(nombre)
-                if nodos:
-                    print(f"✓ Se encontraron {len(nodos)} países:")
-                    for i, nodo in enumerate(nodos, 1):
-                        print(f"   {i}. {nodo.iso3} - {nodo.pais} ({nodo.temperatura_media:.2f}°C)")
-                    
-                    if len(nodos) == 1:
-                        realizar_operaciones = input("\n¿Realizar operaciones con este nodo? (s/n): ")
-                        if realizar_operaciones.lower() == 's':
-                            operaciones_nodo(arbol, nodos[0])
-                    else:
-                        seleccionar = input("\n¿Seleccionar un país para operaciones? (número o 'n'): ")
-                        if seleccionar.isdigit():
-                            indice = int(seleccionar) - 1
-                            if 0 <= indice < len(nodos):
-                                operaciones_nodo(arbol, nodos[indice])
-                else:
-                    print(f"✗ No se encontraron países que contengan '{nombre}'")
-                    
-            elif opcion == 6:  # Buscar países con temperatura >= valor
-                print("\n=== BUSCAR PAÍSES CON TEMPERATURA >= VALOR ===")
-                temperatura_limite = float(input("Temperatura mínima: "))
-                
-                nodos = arbol.buscar_mayor_promedio_global(temperatura_limite)
-                if nodos:
-                    print(f"\n✓ Se encontraron {len(nodos)} países:")
-                    for i, nodo in enumerate(nodos[:10], 1):  # Mostrar solo los primeros 10
-                        print(f"   {i}. {nodo.iso3} - {nodo.pais} ({nodo.temperatura_media:.2f}°C)")
-                    
-                    if len(nodos) > 10:
-                        print(f"   ... y {len(nodos) - 10} más")
-                    
-                    seleccionar = input("\n¿Seleccionar un país para operaciones? (número o 'n'): ")
-                    if seleccionar.isdigit():
-                        indice = int(seleccionar) - 1
-                        if 0 <= indice < min(10, len(nodos)):
-                            operaciones_nodo(arbol, nodos[indice])
-                else:
-                    print("✗ No se encontraron países con esa temperatura mínima")
-                    
-            elif opcion == 7:  # Recorrido por niveles
-                print("\n=== RECORRIDO POR NIVELES ===")
-                niveles = arbol.recorrido_por_niveles()
-                if niveles:
-                    for i, nivel in enumerate(niveles):
-                        print(f"Nivel {i+1}: {' | '.join(nivel)}")
-                else:
-                    print("El árbol está vacío")
-            
-                
-            elif opcion == 8:  # Estadísticas
-                print("\n=== ESTADÍSTICAS DEL DATASET ===")
-                stats = arbol.obtener_estadisticas()
-                if stats:
-                    print(f" Total de países: {stats['total_paises']}")
-                    print(f"  Temperatura mínima: {stats['temperatura_minima']:.2f}°C")
-                    print(f"  Temperatura máxima: {stats['temperatura_maxima']:.2f}°C")
-                    print(f" Temperatura promedio: {stats['temperatura_promedio']:.2f}°C")
-                    print(f" Mediana: {stats['mediana']:.2f}°C")
-                else:
-                    print("No hay datos en el árbol")
-                    
-            elif opcion == 9:  # Operaciones con nodo seleccionado
-                print("\n=== SELECCIONAR NODO PARA OPERACIONES ===")
-                if not arbol.nodos_almacenados:
-                    print("No hay nodos en el árbol")
-                else:
-                    # Mostrar países ordenados por temperatura
-                    paises_ordenados = sorted(arbol.nodos_almacenados, key=lambda x: x.temperatura_media)
-                    print("Países disponibles (ordenados por temperatura):")
-                    
-                    for i, nodo in enumerate(paises_ordenados[:15], 1):  # Mostrar primeros 15
-                        print(f"   {i}. {nodo.iso3} - {nodo.pais} ({nodo.temperatura_media:.3f}°C)")
-                    
-                    if len(paises_ordenados) > 15:
-                        print(f"   ... y {len(paises_ordenados) - 15} más")
-                    
-                    try:
-                        seleccion = int(input("\nSeleccione un país (número): ")) - 1
-                        if 0 <= seleccion < min(15, len(paises_ordenados)):
-                            operaciones_nodo(arbol, paises_ordenados[seleccion])
-                        else:
-                            print("Selección inválida")
-                    except ValueError:
-                        print("Error: Ingrese un número válido")
-                        
-            elif opcion == 10:  # Gráfico simple
-                arbol.crear_grafico()
-                
-            elif opcion == 11:  # Gráfico detallado
-                arbol.crear_grafico_con_leyenda()
-                
-            elif opcion == 12:  # Visualizar búsqueda
-                print("\n=== VISUALIZAR BÚSQUEDA ===")
-                try:
-                    temp = float(input("Temperatura a buscar: "))
-                    arbol.visualizar_busqueda(temp)
-                except ValueError:
-                    print("Error: Ingrese una temperatura válida")
-                    
-            elif opcion == 13:  # Resaltar nodo específico
-                print("\n=== RESALTAR NODO ===")
-                try:
-                    codigo = input("Código ISO3 del país a resaltar: ").upper()
-                    nodo = arbol.buscar_por_codigo(codigo)
-                    if nodo:
-                        nombre = input("Nombre del archivo (Enter para 'arbol_resaltado'): ") or "arbol_resaltado"
-                        arbol.crear_grafico(nombre, "png", True, nodo)
-                        print(f"País {nodo.pais} resaltado en el gráfico")
-                    else:
-                        print(f"No se encontró un país con código {codigo}")
-                except Exception as e:
-                    print(f"Error: {e}")
-
-            elif opcion == 14:  # Recargar datos
-                print("\n=== RECARGAR DATOS DESDE CSV ===")
-                ruta_csv = input("Ingrese la ruta del archivo CSV: ").strip()
-                if ruta_csv:
-                    datos_nuevos = LectorDatos.cargar_datos_desde_csv(ruta_csv)
-                    if datos_nuevos:
-                        confirmar = input(f"¿Reemplazar árbol actual con {len(datos_nuevos)} nuevos países? (s/n): ")
-                        if confirmar.lower() == 's':
-                            # Limpiar árbol actual
-                            arbol = ArbolAVL()
-                            cargados = arbol.cargar_datos_masivamente(datos_nuevos)
-                            print(f"✓ Árbol recargado con {cargados} países")
-                            
-                            # Mostrar nuevas estadísticas
-                            stats = arbol.obtener_estadisticas()
-                            print(f"Nuevas estadísticas:")
-                            print(f"   Rango: {stats['temperatura_minima']:.3f}°C - {stats['temperatura_maxima']:.3f}°C")
-                            print(f"   Promedio: {stats['temperatura_promedio']:.3f}°C")
-                    
-            elif opcion == 15:  # Salir
-                print("\n¡Gracias por usar el programa!")
+            opcion = _como_entero(_leer("Seleccione una opción: "))
+            if opcion is None:
+                print("Error: Por favor ingrese un número válido")
+            elif MANEJADORES_MENU.get(opcion, _opcion_invalida)(arbol):
                 break
                 
-            else:
-                print("Opción inválida")
-                
-        except ValueError:
-            print("Error: Por favor ingrese un número válido")
         except Exception as e:
             print(f"Error inesperado: {e}")
             
-        if opcion != 16:
-            input("\nPresione Enter para continuar...")
+        _leer("\nPresione Enter para continuar...")
 
 if __name__ == "__main__":
     # Verificación si Graphviz está disponible